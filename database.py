@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import time
 from datetime import datetime
 
 # CONFIGURACIÓN DE LA BASE DE DATOS
@@ -7,18 +8,44 @@ if os.environ.get('RENDER'):
     BASE_DIR = "/opt/render/project/data"
     os.makedirs(BASE_DIR, exist_ok=True)
     DB_NAME = os.path.join(BASE_DIR, "casa_apuestas.db")
+    ARCHIVE_DB_NAME = os.path.join(BASE_DIR, "casa_apuestas_archivo.db")
 else:
     DB_NAME = "casa_apuestas.db"
+    ARCHIVE_DB_NAME = "casa_apuestas_archivo.db"
+
+# Tablas que se mueven al archivo, en orden (las apuestas antes que los eventos)
+ARCHIVE_TABLES = ('bets', 'transactions', 'events')
 
 def get_db_connection():
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     return conn
 
+def attach_archive(conn):
+    """Adjunta la base de archivo como esquema `archive` y crea sus tablas si faltan"""
+    cursor = conn.cursor()
+    cursor.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DB_NAME,))
+    for table in ARCHIVE_TABLES:
+        # Mismo esquema que la tabla principal (con su INTEGER PRIMARY KEY), no un CREATE ... AS SELECT
+        cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        schema = cursor.fetchone()['sql']
+        cursor.execute(schema.replace(f'CREATE TABLE {table}', f'CREATE TABLE IF NOT EXISTS archive.{table}', 1))
+        # Archivos creados antes sin clave primaria: índice único sobre id para las lecturas por clave
+        cursor.execute(f'PRAGMA archive.table_info({table})')
+        if not any(col['pk'] for col in cursor.fetchall()):
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_{table}_id ON {table} (id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_bets_user ON bets (user_id)')
+    conn.commit()
+    return conn
+
 def init_db():
     conn = get_db_connection()
     cursor = conn.cursor()
-    
+
+    # Vacuum incremental para liberar espacio tras archivar. Solo tiene efecto en BDs nuevas;
+    # las existentes se convierten aparte con enable_incremental_vacuum()
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
     # Tabla Usuarios
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -75,7 +102,28 @@ def init_db():
         )
     ''')
 
+    # Tabla de coordinación entre instancias: lease del scheduler y último resultado de cada job
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT,
+            expires_at REAL,
+            heartbeat_at REAL,
+            last_run_at REAL,
+            last_status TEXT,
+            last_error TEXT,
+            run_count INTEGER DEFAULT 0
+        )
+    ''')
     conn.commit()
+
+    # Un evento por fixture de la API: dos sync solapados no pueden duplicarlo
+    try:
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_events_api_id ON events (api_event_id)')
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        print(f"Eventos duplicados por api_event_id, índice único no creado: {e}")
+
     conn.close()
 
 # --- FUNCIONES DE USUARIO ---
@@ -120,6 +168,32 @@ def update_transaction_status(trans_id, status):
     conn.commit()
     conn.close()
 
+def approve_deposit(trans_id, amount):
+    """Aprueba un depósito pendiente y acredita el saldo en la misma transacción.
+    Devuelve False si ya estaba procesado, así un /aprobar repetido no acredita dos veces."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE transactions SET status = 'APPROVED', amount = ? WHERE id = ? AND status = 'PENDING'", (amount, trans_id))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            return False
+        cursor.execute('UPDATE users SET balance = balance + ? WHERE user_id = (SELECT user_id FROM transactions WHERE id = ?)', (amount, trans_id))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+def approve_transaction(trans_id):
+    """Marca como aprobada una transacción pendiente; False si ya estaba procesada"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE transactions SET status = 'APPROVED' WHERE id = ? AND status = 'PENDING'", (trans_id,))
+    approved = cursor.rowcount == 1
+    conn.commit()
+    conn.close()
+    return approved
+
 def get_transaction(trans_id):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -133,7 +207,7 @@ def create_event_auto(name, o_local, o_draw, o_away, api_id, date_str):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('''
-        INSERT INTO events (name, odds_local, odds_draw, odds_away, api_event_id, event_date)
+        INSERT OR IGNORE INTO events (name, odds_local, odds_draw, odds_away, api_event_id, event_date)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (name, o_local, o_draw, o_away, api_id, date_str))
     conn.commit()
@@ -187,10 +261,19 @@ def place_bet(user_id, event_id, selection, odds, amount, potential_win):
     finally:
         conn.close()
 
-def get_bets_by_user(user_id):
+def get_bets_by_user(user_id, include_archived=False):
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM bets WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
+    if include_archived:
+        attach_archive(conn)
+        cursor.execute('''
+            SELECT * FROM main.bets WHERE user_id = ?
+            UNION ALL
+            SELECT * FROM archive.bets WHERE user_id = ?
+            ORDER BY created_at DESC
+        ''', (user_id, user_id))
+    else:
+        cursor.execute('SELECT * FROM bets WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
     rows = cursor.fetchall()
     conn.close()
     return [dict(row) for row in rows]
@@ -202,5 +285,172 @@ def deactivate_event(event_id):
     conn.commit()
     conn.close()
 
+# --- ARCHIVO (HOT/COLD) ---
+def archive_settled_records(days=30, batch_size=500):
+    """Mueve al archivo apuestas liquidadas, transacciones cerradas y eventos inactivos con más de `days` días"""
+    cutoff = f'-{int(days)} days'
+    criteria = {
+        'bets': "status IN ('WON', 'LOST') AND created_at < datetime('now', ?)",
+        'transactions': "status != 'PENDING' AND created_at < datetime('now', ?)",
+        'events': "is_active = 0 AND created_at < datetime('now', ?) "
+                  "AND id NOT IN (SELECT event_id FROM main.bets WHERE event_id IS NOT NULL)",
+    }
+    conn = attach_archive(get_db_connection())
+    cursor = conn.cursor()
+    moved = {}
+    try:
+        for table in ARCHIVE_TABLES:
+            moved[table] = 0
+            while True:
+                cursor.execute(f'SELECT id FROM main.{table} WHERE {criteria[table]} ORDER BY id LIMIT ?', (cutoff, batch_size))
+                ids = [row['id'] for row in cursor.fetchall()]
+                if not ids: break
+                marks = ','.join('?' * len(ids))
+                # Copia y borrado en la misma transacción: se mueve el lote entero o nada
+                cursor.execute(f'INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE id IN ({marks})', ids)
+                cursor.execute(f'DELETE FROM main.{table} WHERE id IN ({marks})', ids)
+                conn.commit()
+                moved[table] += len(ids)
+        cursor.execute('PRAGMA main.incremental_vacuum').fetchall()
+        return moved
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def enable_incremental_vacuum():
+    """Mantenimiento puntual: pasa una BD antigua a auto_vacuum=INCREMENTAL.
+    Necesita un VACUUM completo (bloquea la BD y pide tanto espacio libre como ocupa);
+    si falla se registra y se sigue sin vacuum incremental."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] == 2: return True
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+        return True
+    except sqlite3.Error as e:
+        print(f"Error vacuum: {e}")
+        return False
+    finally:
+        conn.close()
+
+# --- LEASES ENTRE INSTANCIAS ---
+def acquire_lease(name, holder, ttl):
+    """Toma o renueva el lease si está libre, caducado o ya es nuestro. Devuelve True si lo tenemos."""
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    # Una sola sentencia: SQLite la ejecuta de forma atómica aunque compitan varias instancias
+    cursor.execute('''
+        INSERT INTO job_leases (name, holder, expires_at, heartbeat_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            holder = excluded.holder, expires_at = excluded.expires_at, heartbeat_at = excluded.heartbeat_at
+        WHERE job_leases.holder = excluded.holder OR job_leases.holder IS NULL OR job_leases.expires_at < ?
+    ''', (name, holder, now + ttl, now, now))
+    acquired = cursor.rowcount == 1
+    conn.commit()
+    conn.close()
+    return acquired
+
+def holds_lease(name, holder):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM job_leases WHERE name = ? AND holder = ? AND expires_at > ?', (name, holder, time.time()))
+    row = cursor.fetchone()
+    conn.close()
+    return row is not None
+
+def get_lease_holder(name):
+    """Instancia que tiene el lease ahora mismo, o None si está libre o caducado"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT holder FROM job_leases WHERE name = ? AND expires_at > ?', (name, time.time()))
+    row = cursor.fetchone()
+    conn.close()
+    return row['holder'] if row else None
+
+def release_lease(name, holder):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE job_leases SET holder = NULL, expires_at = 0 WHERE name = ? AND holder = ?', (name, holder))
+    conn.commit()
+    conn.close()
+
+def record_job_run(job_name, holder, status, error=None):
+    """Guarda el resultado de la última ejecución de un job (fila `job:<nombre>`)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO job_leases (name, holder, last_run_at, last_status, last_error, run_count) VALUES (?, ?, ?, ?, ?, 1)
+        ON CONFLICT(name) DO UPDATE SET
+            holder = excluded.holder, last_run_at = excluded.last_run_at, last_status = excluded.last_status,
+            last_error = excluded.last_error, run_count = job_leases.run_count + 1
+    ''', (f"job:{job_name}", holder, time.time(), status, error))
+    conn.commit()
+    conn.close()
+
+def get_job_leases():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM job_leases ORDER BY name')
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+# --- EXPORTACIÓN ---
+EXPORT_TABLES = ('bets', 'transactions', 'users')
+
+def get_export_columns(table):
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Tabla no exportable: {table}")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'PRAGMA table_info({table})')
+    columns = [row['name'] for row in cursor.fetchall()]
+    conn.close()
+    return columns
+
+def get_export_chunk(table, after=None, date_from=None, date_to=None, status=None, include_archived=False, limit=500):
+    """Siguiente bloque de filas ordenado por clave (keyset): `after` es la última clave ya enviada.
+    Cada bloque es una lectura corta con su propia conexión, así ningún SELECT queda abierto
+    (con su lock SHARED) mientras se envía la respuesta."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Tabla no exportable: {table}")
+    if table == 'users' and (status or include_archived):
+        raise ValueError("users no admite status ni archivo")
+    key = 'user_id' if table == 'users' else 'id'
+    where, params = [], []
+    if date_from:
+        where.append('created_at >= ?'); params.append(date_from)
+    if date_to:
+        where.append("created_at < date(?, '+1 day')"); params.append(date_to)
+    if status:
+        where.append('status = ?'); params.append(status)
+    if after is not None:
+        where.append(f'{key} > ?'); params.append(after)
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+    conn = get_db_connection()
+    try:
+        if include_archived:
+            # Los ids se conservan al archivar (AUTOINCREMENT no los reutiliza) y ambas tablas tienen
+            # id como clave, así que es único en la unión. Cada rama lee como mucho `limit` filas
+            # por su índice y solo esas se ordenan: cada bloque cuesta lo mismo sea cual sea el tamaño
+            attach_archive(conn)
+            sql = (f'SELECT * FROM (SELECT * FROM main.{table}{clause} ORDER BY {key} LIMIT ?) '
+                   f'UNION ALL SELECT * FROM (SELECT * FROM archive.{table}{clause} ORDER BY {key} LIMIT ?) '
+                   f'ORDER BY {key} LIMIT ?')
+            params = params + [limit] + params + [limit]
+        else:
+            sql = f'SELECT * FROM {table}{clause} ORDER BY {key} LIMIT ?'
+        cursor = conn.cursor()
+        cursor.execute(sql, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
 # Inicializar DB
 init_db()
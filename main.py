@@ -1,17 +1,31 @@
 import os
+import sys
+import socket
 import logging
 import asyncio
 import requests
 import json
+import csv
+import io
+import hmac
 from datetime import datetime, timedelta
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from functools import wraps
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup,
+    InlineQueryResultArticle, InputTextMessageContent
+)
 from telegram.ext import (
     Application, CommandHandler, CallbackQueryHandler, 
-    MessageHandler, filters, ContextTypes, ConversationHandler
+    MessageHandler, filters, ContextTypes, ConversationHandler, TypeHandler,
+    InlineQueryHandler
 )
+from telegram.helpers import escape_markdown
 from dotenv import load_dotenv
 from aiohttp import web
 import database as db
+from throttle import UpdateThrottle
+from profiler import Profiler, traced_application_class
+from search_index import EventIndex
 
 # --- CONFIGURACIÓN ---
 load_dotenv()
@@ -19,6 +33,42 @@ TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_IDS = [int(x.strip()) for x in os.getenv("ADMIN_ID").split(',')]
 BANK_DETAILS = os.getenv("BANK_DETAILS")
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
+ARCHIVE_DAYS = int(os.getenv("ARCHIVE_DAYS", 30))
+
+# Varias réplicas: solo la que tiene el lease del scheduler ejecuta los jobs
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEASE_TTL = int(os.getenv("LEASE_TTL", 60))
+SCHEDULER_LEASE = "scheduler"
+EXPORT_TOKEN = os.getenv("EXPORT_TOKEN")
+EXPORT_CHUNK_ROWS = 500
+
+# Límites por usuario (ver throttle.py)
+throttle = UpdateThrottle(
+    rate=float(os.getenv("THROTTLE_RATE", 1.0)),
+    burst=int(os.getenv("THROTTLE_BURST", 5)),
+    dedupe_window=float(os.getenv("DEDUPE_WINDOW", 1.5)),
+    exempt_ids=ADMIN_IDS,
+)
+
+# Instrumentación (PROFILE_MODE=1): muestreo de trazas y log de updates lentos
+profiler = Profiler()
+profiler.configure(
+    enabled=os.getenv("PROFILE_MODE") == "1",
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0.1)),
+    slow_ms=float(os.getenv("PROFILE_SLOW_MS", 1000)),
+    log_path=os.path.join(os.path.dirname(db.DB_NAME), "slow_updates.jsonl"),
+)
+# Funciones de consulta con span propio (no los helpers get_db_connection/attach_archive/init_db,
+# que solo añadirían un hijo repetido a cada span)
+TRACED_DB_FUNCTIONS = (
+    'register_or_update_user', 'get_user_balance', 'update_user_balance',
+    'create_transaction', 'update_transaction_status', 'approve_deposit', 'approve_transaction', 'get_transaction',
+    'create_event_auto', 'get_event_by_api_id', 'get_all_events', 'get_active_events', 'update_event_odds',
+    'place_bet', 'get_bets_by_user', 'deactivate_event',
+    'archive_settled_records', 'enable_incremental_vacuum',
+    'acquire_lease', 'holds_lease', 'get_lease_holder', 'release_lease', 'record_job_run', 'get_job_leases',
+    'get_export_columns', 'get_export_chunk',
+)
 
 LEAGUES = {
     "La Liga": "la_liga",
@@ -30,6 +80,9 @@ LEAGUES = {
 
 logging.basicConfig(level=logging.INFO)
 
+# Índice en memoria de eventos activos para /buscar y el modo inline
+event_index = EventIndex()
+
 # ESTADOS
 UPLOAD_PHOTO, CONFIRM_DEPOSIT = range(2)
 SELECT_LEAGUE, AMOUNT, CONFIRM_BET = range(3)
@@ -86,6 +139,34 @@ def fetch_scores_api():
 
 # --- CRON JOBS ---
 
+def leader_only(job):
+    """El job solo corre en la instancia que tiene el lease y deja su resultado en job_leases"""
+    @wraps(job)
+    async def wrapper(context: ContextTypes.DEFAULT_TYPE):
+        if not db.holds_lease(SCHEDULER_LEASE, INSTANCE_ID): return
+        try:
+            await job(context)
+        except Exception as e:
+            db.record_job_run(job.__name__, INSTANCE_ID, 'ERROR', str(e))
+            raise
+        db.record_job_run(job.__name__, INSTANCE_ID, 'OK')
+    return wrapper
+
+async def lease_heartbeat_job(context: ContextTypes.DEFAULT_TYPE):
+    was_leader = context.bot_data.get('is_leader', False)
+    is_leader = db.acquire_lease(SCHEDULER_LEASE, INSTANCE_ID, LEASE_TTL)
+    context.bot_data['is_leader'] = is_leader
+    if is_leader != was_leader:
+        logging.info(f"👑 {INSTANCE_ID} {'toma' if is_leader else 'pierde'} el rol de scheduler")
+
+async def refresh_index_job(context: ContextTypes.DEFAULT_TYPE):
+    # Cada réplica solo ve sus propios cambios (sync/payouts en la líder, ediciones de cuotas
+    # en cualquiera): todas recargan el índice desde la BD, también la líder
+    event_index.build(db.get_active_events())
+
+async def release_scheduler_lease(application: Application):
+    db.release_lease(SCHEDULER_LEASE, INSTANCE_ID)
+
 async def sync_events_job(context: ContextTypes.DEFAULT_TYPE):
     logging.info("🔄 Sincronizando eventos (Cada 2 horas)...")
     for league_name, sport_key in LEAGUES.items():
@@ -113,6 +194,7 @@ async def sync_events_job(context: ContextTypes.DEFAULT_TYPE):
                 f"{fix.get('home_team')} vs {fix.get('away_team')}", 
                 o_local, o_draw, o_away, api_id, fix.get('commence_time')
             )
+            event_index.add(db.get_event_by_api_id(api_id))
 
 async def auto_payouts_job(context: ContextTypes.DEFAULT_TYPE):
     logging.info("💰 Verificando resultados...")
@@ -135,23 +217,33 @@ async def auto_payouts_job(context: ContextTypes.DEFAULT_TYPE):
         
         conn = db.get_db_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM bets WHERE event_id = (SELECT id FROM events WHERE api_event_id = ?) AND status="PENDING" AND is_combo=0', (api_id,))
+        # IN y no =: BDs antiguas pueden tener el mismo fixture duplicado y hay apuestas en ambas copias
+        cursor.execute('SELECT * FROM bets WHERE event_id IN (SELECT id FROM events WHERE api_event_id = ?) AND status="PENDING" AND is_combo=0', (api_id,))
         bets = cursor.fetchall()
         if not bets: conn.close(); continue
         
         for bet in bets:
             b = dict(bet)
             if b['selection'] == winner:
-                db.update_user_balance(b['user_id'], b['potential_win'])
-                cursor.execute('UPDATE bets SET status="WON" WHERE id=?', (b['id'],))
+                # Solo paga quien cambia el estado: otra instancia no puede cobrar la misma apuesta
+                cursor.execute('UPDATE bets SET status="WON" WHERE id=? AND status="PENDING"', (b['id'],))
+                if cursor.rowcount != 1: continue
+                cursor.execute('UPDATE users SET balance = balance + ? WHERE user_id = ?', (b['potential_win'], b['user_id']))
                 try: await context.bot.send_message(chat_id=b['user_id'], text=f"🎉 GANASTE! +${b['potential_win']:.2f}")
                 except: pass
             else:
-                cursor.execute('UPDATE bets SET status="LOST" WHERE id=?', (b['id'],))
+                cursor.execute('UPDATE bets SET status="LOST" WHERE id=? AND status="PENDING"', (b['id'],))
         
         cursor.execute('UPDATE events SET is_active=0 WHERE api_event_id=?', (api_id,))
         conn.commit()
         conn.close()
+        event_index.remove_by_api_id(api_id)
+
+async def archive_job(context: ContextTypes.DEFAULT_TYPE):
+    logging.info("🗄️ Archivando registros liquidados...")
+    # En un hilo aparte para no bloquear el bot mientras se mueven los lotes
+    moved = await asyncio.to_thread(db.archive_settled_records, ARCHIVE_DAYS)
+    logging.info(f"🗄️ Archivados: {moved}")
 
 # --- HANDLERS USUARIO ---
 
@@ -281,22 +373,32 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif data == 'my_balance':
         bal = db.get_user_balance(user_id)
         await query.edit_message_text(f"💰 Saldo: ${bal}", reply_markup=InlineKeyboardMarkup(get_main_keyboard()))
-    elif data == 'my_bets':
-        bets = db.get_bets_by_user(user_id)
-        if not bets: await query.edit_message_text("Sin apuestas.", reply_markup=InlineKeyboardMarkup(get_main_keyboard())); return
-        text = "🎟️ **Apuestas:**\n\n"
-        for b in bets[:5]:
+    elif data in ('my_bets', 'my_bets_all'):
+        # 'my_bets_all' incluye las apuestas ya movidas al archivo
+        full = data == 'my_bets_all'
+        bets = db.get_bets_by_user(user_id, include_archived=full)
+        keyboard = get_main_keyboard()
+        if not full: keyboard.insert(0, [InlineKeyboardButton("🗂️ Historial completo", callback_data='my_bets_all')])
+        if not bets: await query.edit_message_text("Sin apuestas.", reply_markup=InlineKeyboardMarkup(keyboard)); return
+        text = "🎟️ **Historial:**\n\n" if full else "🎟️ **Apuestas:**\n\n"
+        for b in bets[:20 if full else 5]:
             status = "⏳" if b['status'] == 'PENDING' else ("✅" if b['status'] == 'WON' else "❌")
             combo = " 🎰" if b['is_combo'] else ""
-            text += f"{status} ${b['amount']} -> ${b['potential_win']:.2f}{combo}\n"
-        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(get_main_keyboard()))
+            date = f"{b['created_at'][:10]} " if full else ""
+            text += f"{date}{status} ${b['amount']} -> ${b['potential_win']:.2f}{combo}\n"
+        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
 
     # ADMIN HANDLERS
     elif data == 'admin_list_events':
         await admin_list_events(update, context)
     elif data == 'admin_sync_now':
+        # Solo la instancia líder sincroniza; las demás duplicarían llamadas a la API
+        if not db.holds_lease(SCHEDULER_LEASE, INSTANCE_ID):
+            leader = db.get_lease_holder(SCHEDULER_LEASE) or "ninguna"
+            await query.edit_message_text(f"⚠️ Esta instancia ({INSTANCE_ID}) no es la líder.\nLíder actual: {leader}. La sincronización corre allí en su próximo ciclo.")
+            return
         await query.answer("Forzando sincronización...")
-        await sync_events_job(context)
+        await leader_only(sync_events_job)(context)
         await query.edit_message_text("✅ Sincronización completada.")
     elif data == 'admin_edit_start':
         await admin_edit_start_flow(update, context)
@@ -380,8 +482,11 @@ async def handle_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             info = context.user_data['pending_bet']
             potential = amount * info['odds']
-            db.place_bet(user_id, info['event_id'], info['selection'], info['odds'], amount, potential)
+            placed = db.place_bet(user_id, info['event_id'], info['selection'], info['odds'], amount, potential)
             del context.user_data['pending_bet']
+            if not placed:
+                await query.edit_message_text("❌ No se pudo registrar la apuesta. Inténtalo de nuevo.", reply_markup=InlineKeyboardMarkup(get_main_keyboard()))
+                return ConversationHandler.END
 
         ticket = f"🎟️ **TICKET**\n\n💰 ${amount}\n🤑 ${potential:.2f}\n\n¡Suerte! 🍀"
         await query.edit_message_text("✅ ¡Hecho!", reply_markup=InlineKeyboardMarkup(get_main_keyboard()))
@@ -462,11 +567,12 @@ async def cmd_approve(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not trans: return
         if trans['type'] == 'DEPOSIT':
             amount = float(val2)
-            db.update_user_balance(trans['user_id'], amount)
-            db.update_transaction_status(trans_id, 'APPROVED')
-            await update.message.reply_text(f"✅ Aprobado ${amount}")
+            if db.approve_deposit(trans_id, amount): await update.message.reply_text(f"✅ Aprobado ${amount}")
+            else: await update.message.reply_text(f"⚠️ La transacción {trans_id} ya estaba procesada.")
         elif trans['type'] == 'WITHDRAW':
-            if val2 == 'ok': db.update_transaction_status(trans_id, 'APPROVED')
+            if val2 != 'ok': return
+            if db.approve_transaction(trans_id): await update.message.reply_text("✅ Retiro aprobado")
+            else: await update.message.reply_text(f"⚠️ La transacción {trans_id} ya estaba procesada.")
     except: pass
 
 # --- COMANDOS ADMIN PANEL ---
@@ -510,28 +616,185 @@ async def admin_process_edit(update: Update, context: ContextTypes.DEFAULT_TYPE)
         event_id = int(parts[0])
         o1, ox, o2 = float(parts[1]), float(parts[2]), float(parts[3])
         db.update_event_odds(event_id, o1, ox, o2)
+        event_index.update_odds(event_id, o1, ox, o2)
         await update.message.reply_text(f"✅ ID {event_id} actualizado.")
     except: await update.message.reply_text("❌ Error. Usa: ID C1 CX C2")
     return ConversationHandler.END
 
+# --- BÚSQUEDA ---
+async def cmd_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    term = ' '.join(context.args)
+    if not term:
+        await update.message.reply_text("Uso: /buscar <equipo>")
+        return
+    events = event_index.search(term, limit=10)
+    if not events:
+        await update.message.reply_text("Sin resultados.", reply_markup=InlineKeyboardMarkup(get_main_keyboard()))
+        return
+    # Markdown antiguo no admite escapes dentro de una entidad: el texto del usuario va fuera de * *
+    text = f"🔎 *Resultados:* {escape_markdown(term)}\n\n"
+    keyboard = []
+    for ev in events:
+        api_id = ev['api_event_id']
+        o1, ox, o2 = ev['odds_local'], ev['odds_draw'], ev['odds_away']
+        text += f"⚽ {escape_markdown(ev['name'])}\n1️⃣ {o1} | X {ox} | 2️⃣ {o2}\n\n"
+        keyboard.append([
+            InlineKeyboardButton(f"1 ({o1})", callback_data=f'select_{api_id}_local_{o1}'),
+            InlineKeyboardButton(f"X ({ox})", callback_data=f'select_{api_id}_draw_{ox}'),
+            InlineKeyboardButton(f"2 ({o2})", callback_data=f'select_{api_id}_away_{o2}')
+        ])
+    keyboard.append([InlineKeyboardButton("⬅️ Menú", callback_data='back_menu')])
+    await update.message.reply_text(text, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
+
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.inline_query
+    results = []
+    for ev in event_index.search(query.query, limit=20):
+        odds = f"1️⃣ {ev['odds_local']} | X {ev['odds_draw']} | 2️⃣ {ev['odds_away']}"
+        results.append(InlineQueryResultArticle(
+            id=str(ev['id']), title=ev['name'], description=odds,
+            input_message_content=InputTextMessageContent(f"⚽ {ev['name']}\n{odds}")
+        ))
+    await query.answer(results, cache_time=30)
+
 async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_admin(update.effective_user.id): await cmd_admin_panel(update, context)
 
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id): return
+    try: seconds = min(int(context.args[0]), 120) if context.args else 10
+    except ValueError: seconds = 10
+    await update.message.reply_text(f"⏱️ Perfilando {seconds}s...")
+    # En segundo plano: los updates se procesan de uno en uno, así que esperar aquí
+    # congelaría el bot y solo se perfilaría un loop ocioso
+    context.application.create_task(send_profile_report(update.message, seconds), update=update)
+
+async def send_profile_report(message, seconds):
+    report = await profiler.capture_cprofile(seconds)
+    if report is None:
+        await message.reply_text("Ya hay una captura en curso.")
+        return
+    await message.reply_document(document=io.BytesIO(report.encode('utf-8')), filename="perfil.txt")
+
+async def cmd_compact(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id): return
+    await update.message.reply_text("🧹 Convirtiendo la BD a vacuum incremental...")
+    ok = await asyncio.to_thread(db.enable_incremental_vacuum)
+    await update.message.reply_text("✅ Listo." if ok else "❌ Falló (¿espacio en disco?). Ver logs.")
+
+async def cmd_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id): return
+    text = f"🖥️ Instancia: {INSTANCE_ID}\n\n"
+    for row in db.get_job_leases():
+        if row['name'] == SCHEDULER_LEASE:
+            left = int(row['expires_at'] - datetime.now().timestamp()) if row['holder'] else 0
+            text += f"👑 Scheduler: {row['holder'] or '—'} (expira en {max(left, 0)}s)\n"
+        else:
+            when = datetime.fromtimestamp(row['last_run_at']).strftime('%d/%m %H:%M') if row['last_run_at'] else '—'
+            text += f"• {row['name'][4:]}: {row['last_status']} {when} en {row['holder']} ({row['run_count']} ejec.)\n"
+            if row['last_error']: text += f"   ⚠️ {row['last_error'][:100]}\n"
+    await update.message.reply_text(text)
+
+async def cmd_throttle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id): return
+    stats = throttle.stats()
+    suppressed = "\n".join(f"• {k}: {v}" for k, v in stats['suppressed'].items()) or "• ninguno"
+    await update.message.reply_text(
+        f"🚦 Límites: {throttle.rate}/s, ráfaga {throttle.burst}, dedupe {throttle.dedupe_window}s\n\n"
+        f"Descartados:\n{suppressed}\n\nUsuarios: {stats['tracked_users']}"
+    )
+
 # --- WEB SERVER ---
 async def handle_health(request): return web.Response(text="OK")
+
+def check_web_auth(request):
+    """Las rutas privadas exigen `Authorization: Bearer <EXPORT_TOKEN>`"""
+    auth = request.headers.get('Authorization', '')
+    if not EXPORT_TOKEN or not hmac.compare_digest(auth, f"Bearer {EXPORT_TOKEN}"):
+        raise web.HTTPUnauthorized(text="No autorizado")
+
+async def handle_profile(request):
+    """GET /debug/profile?seconds=10: captura cProfile del bot y devuelve el informe"""
+    check_web_auth(request)
+    try: seconds = min(int(request.query.get('seconds', 10)), 120)
+    except ValueError: raise web.HTTPBadRequest(text="seconds debe ser un entero")
+    report = await profiler.capture_cprofile(seconds)
+    if report is None: raise web.HTTPConflict(text="Ya hay una captura en curso")
+    return web.Response(text=report)
+
+async def handle_export(request):
+    """GET /export/{bets|transactions|users}?format=csv|ndjson&from=AAAA-MM-DD&to=AAAA-MM-DD&status=...&archived=1"""
+    check_web_auth(request)
+    table = request.match_info['table']
+    fmt = request.query.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'): raise web.HTTPBadRequest(text="format debe ser csv o ndjson")
+    date_from, date_to = request.query.get('from'), request.query.get('to')
+    try:
+        for d in (date_from, date_to):
+            if d: datetime.strptime(d, '%Y-%m-%d')
+    except ValueError:
+        raise web.HTTPBadRequest(text="Fechas en formato AAAA-MM-DD")
+
+    # Todo el trabajo de SQLite va al executor para no bloquear el bot
+    loop = asyncio.get_running_loop()
+    filters_ = dict(date_from=date_from, date_to=date_to, status=request.query.get('status'),
+                    include_archived=request.query.get('archived') == '1', limit=EXPORT_CHUNK_ROWS)
+    try:
+        columns = await loop.run_in_executor(None, db.get_export_columns, table)
+        rows = await loop.run_in_executor(None, lambda: db.get_export_chunk(table, **filters_))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson',
+        'Content-Disposition': f'attachment; filename="{table}.{fmt}"',
+    })
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    key = 'user_id' if table == 'users' else 'id'
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == 'csv': writer.writerow(columns)
+    while rows:
+        for row in rows:
+            if fmt == 'csv': writer.writerow([row[c] for c in columns])
+            else: buf.write(json.dumps(row, ensure_ascii=False) + "\n")
+        await response.write(buf.getvalue().encode('utf-8'))
+        buf.seek(0); buf.truncate()
+        last = rows[-1][key]
+        rows = await loop.run_in_executor(None, lambda: db.get_export_chunk(table, after=last, **filters_))
+    if buf.tell(): await response.write(buf.getvalue().encode('utf-8'))
+    await response.write_eof()
+    return response
+
 async def run_web_server(app):
     runner = web.AppRunner(app); await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', int(os.environ.get("PORT", 10000)))
     await site.start()
 
 def main():
-    application = Application.builder().token(TOKEN).build()
+    builder = Application.builder().token(TOKEN).post_shutdown(release_scheduler_lease)
+    if profiler.enabled:
+        builder = builder.application_class(traced_application_class(profiler))
+        profiler.instrument_module(db, 'db', names=TRACED_DB_FUNCTIONS)
+        profiler.instrument_module(sys.modules[__name__], 'http', names=('fetch_odds_api', 'fetch_scores_api'))
+    application = builder.build()
+
+    # Middleware: se ejecuta antes que cualquier handler y puede cortar el update
+    application.add_handler(TypeHandler(Update, throttle.middleware), group=-1)
     
     # Comandos
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("admin", cmd_admin))
     application.add_handler(CommandHandler("admin_panel", cmd_admin_panel))
     application.add_handler(CommandHandler("aprobar", cmd_approve))
+    application.add_handler(CommandHandler("limites", cmd_throttle_stats))
+    application.add_handler(CommandHandler("jobs", cmd_jobs))
+    application.add_handler(CommandHandler("compactar", cmd_compact))
+    application.add_handler(CommandHandler("perfil", cmd_profile))
+    application.add_handler(CommandHandler("buscar", cmd_search))
+    application.add_handler(InlineQueryHandler(inline_search))
     
     # Botones
     application.add_handler(CallbackQueryHandler(button_handler))
@@ -567,16 +830,27 @@ def main():
         fallbacks=[CommandHandler('cancel', lambda u,c: u.message.reply_text("Cancelado") or ConversationHandler.END)]
     )
     application.add_handler(admin_edit_conv)
+    profiler.instrument_handlers(application)
+
+    # Índice de búsqueda: carga inicial; luego lo mantienen los jobs
+    event_index.build(db.get_active_events())
 
-    # CRON (2 Horas = 7200 segundos)
+    # CRON (2 Horas = 7200 segundos). El heartbeat corre en todas las réplicas; el resto solo en la líder
     job_queue = application.job_queue
     if job_queue:
-        job_queue.run_repeating(sync_events_job, interval=7200, first=10)
-        job_queue.run_repeating(auto_payouts_job, interval=600, first=60)
+        job_queue.run_repeating(lease_heartbeat_job, interval=max(LEASE_TTL // 3, 1), first=0)
+        job_queue.run_repeating(refresh_index_job, interval=120, first=120)
+        job_queue.run_repeating(profiler.job(leader_only(sync_events_job)), interval=7200, first=10)
+        job_queue.run_repeating(profiler.job(leader_only(auto_payouts_job)), interval=600, first=60)
+        job_queue.run_repeating(profiler.job(leader_only(archive_job)), interval=86400, first=300)
 
     # WEB
     web_app = web.Application()
-    web_app.add_routes([web.get('/', handle_health)])
+    web_app.add_routes([
+        web.get('/', handle_health),
+        web.get('/export/{table}', handle_export),
+        web.get('/debug/profile', handle_profile),
+    ])
     loop = asyncio.get_event_loop()
     loop.create_task(run_web_server(web_app))
     
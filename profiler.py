@@ -0,0 +1,184 @@
+import io
+import json
+import time
+import random
+import asyncio
+import inspect
+import logging
+import cProfile
+import pstats
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from telegram.ext import Application, ConversationHandler
+
+# Span activo de la traza en curso (None = no se está muestreando)
+_current_span = ContextVar('profiler_span', default=None)
+
+class Span:
+    __slots__ = ('name', 'start', 'duration', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.children = []
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'ms': round((self.duration or 0) * 1000, 2),
+            'children': [c.to_dict() for c in self.children],
+        }
+
+class Profiler:
+    """Instrumentación opcional: árbol de spans (update/job -> handler -> db -> http)
+    para una fracción de updates, log JSON-lines de los lentos y captura cProfile bajo demanda.
+    Con el modo apagado no se envuelve nada y el coste es cero."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.slow_ms = 1000.0
+        self._slow_log = None
+        self._capturing = False
+
+    def configure(self, enabled, sample_rate=0.1, slow_ms=1000, log_path="slow_updates.jsonl",
+                  max_bytes=5 * 1024 * 1024, backups=3):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        if enabled and self._slow_log is None:
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._slow_log = logging.getLogger('betsport.slow')
+            self._slow_log.propagate = False
+            self._slow_log.setLevel(logging.INFO)
+            self._slow_log.addHandler(handler)
+
+    # --- SPANS ---
+    @contextmanager
+    def root(self, name):
+        """Raíz de una traza. Siempre mide la duración; solo guarda el árbol si cae en la muestra."""
+        if not self.enabled:
+            yield
+            return
+        span = Span(name)
+        token = _current_span.set(span if random.random() < self.sample_rate else None)
+        try:
+            yield
+        finally:
+            sampled = _current_span.get() is not None
+            _current_span.reset(token)
+            span.finish()
+            ms = span.duration * 1000
+            if ms >= self.slow_ms:
+                entry = {
+                    'ts': datetime.now(timezone.utc).isoformat(),
+                    'name': name,
+                    'ms': round(ms, 2),
+                    'sampled': sampled,
+                }
+                if sampled: entry['spans'] = span.to_dict()['children']
+                self._slow_log.info(json.dumps(entry, ensure_ascii=False))
+
+    @contextmanager
+    def span(self, name):
+        parent = _current_span.get()
+        if parent is None:
+            yield
+            return
+        span = Span(name)
+        parent.children.append(span)
+        token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            span.finish()
+            _current_span.reset(token)
+
+    def traced(self, name, func):
+        """Envuelve una función (sync o async) en un span con el nombre dado"""
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def job(self, func):
+        """Cada ejecución de un job es la raíz de su propia traza"""
+        if not self.enabled: return func
+
+        @wraps(func)
+        async def wrapper(context):
+            with self.root(f"job:{func.__name__}"):
+                return await func(context)
+        return wrapper
+
+    # --- INSTRUMENTACIÓN ---
+    def instrument_module(self, module, prefix, names=None):
+        """Sustituye las funciones públicas del módulo por versiones con span"""
+        if not self.enabled: return
+        for attr, value in list(vars(module).items()):
+            if names is not None and attr not in names: continue
+            if attr.startswith('_') or not inspect.isfunction(value): continue
+            if value.__module__ != module.__name__: continue
+            setattr(module, attr, self.traced(f"{prefix}.{attr}", value))
+
+    def instrument_handlers(self, application):
+        """Envuelve el callback de cada handler registrado (incluidas las conversaciones)"""
+        if not self.enabled: return
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                if isinstance(handler, ConversationHandler):
+                    nested = handler.entry_points + handler.fallbacks
+                    for state_handlers in handler.states.values(): nested += state_handlers
+                else:
+                    nested = [handler]
+                for h in nested:
+                    name = getattr(h.callback, '__name__', type(h).__name__)
+                    h.callback = self.traced(f"handler.{name}", h.callback)
+
+    # --- CPROFILE BAJO DEMANDA ---
+    async def capture_cprofile(self, seconds=10, limit=40):
+        """Perfila el hilo del bot durante `seconds` y devuelve el informe de pstats"""
+        if self._capturing: return None
+        self._capturing = True
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            prof.disable()
+            self._capturing = False
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+def describe_update(update):
+    """Nombre corto del update para la raíz de la traza"""
+    if getattr(update, 'callback_query', None) and update.callback_query.data:
+        return f"callback:{update.callback_query.data.split('_')[0]}"
+    if getattr(update, 'message', None) and update.message.text and update.message.text.startswith('/'):
+        return f"command:{update.message.text.split()[0]}"
+    return "update"
+
+def traced_application_class(profiler):
+    """Subclase de Application cuyo process_update abre la raíz de la traza"""
+    class TracedApplication(Application):
+        async def process_update(self, update):
+            with profiler.root(describe_update(update)):
+                await super().process_update(update)
+    return TracedApplication
@@ -0,0 +1,78 @@
+import re
+import bisect
+import unicodedata
+
+def normalize(text):
+    """Minúsculas sin acentos y solo alfanuméricos: 'Atlético' -> 'atletico'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    return re.sub(r'[^0-9a-z]+', ' ', text).strip()
+
+def tokenize(text):
+    return normalize(text).split()
+
+class EventIndex:
+    """Índice en memoria de los eventos activos por tokens del nombre.
+    Cada token de la búsqueda se trata como prefijo y los resultados se intersectan,
+    así que 'real ma' encuentra 'Real Madrid vs Getafe' sin tocar la BD."""
+
+    def __init__(self):
+        self._events = {}    # event id -> evento (dict de la BD)
+        self._by_api = {}    # api_event_id -> event id
+        self._postings = {}  # token -> set de event ids
+        self._tokens = []    # tokens ordenados, para buscar por prefijo con bisect
+
+    def __len__(self):
+        return len(self._events)
+
+    def build(self, events):
+        self._events, self._by_api, self._postings, self._tokens = {}, {}, {}, []
+        for ev in events: self.add(ev)
+
+    def add(self, event):
+        if event['id'] in self._events: self.remove(event['id'])
+        self._events[event['id']] = event
+        if event.get('api_event_id'): self._by_api[event['api_event_id']] = event['id']
+        for tok in set(tokenize(event['name'])):
+            if tok not in self._postings:
+                self._postings[tok] = set()
+                bisect.insort(self._tokens, tok)
+            self._postings[tok].add(event['id'])
+
+    def remove(self, event_id):
+        event = self._events.pop(event_id, None)
+        if not event: return
+        self._by_api.pop(event.get('api_event_id'), None)
+        for tok in set(tokenize(event['name'])):
+            ids = self._postings.get(tok)
+            if ids is None: continue
+            ids.discard(event_id)
+            if not ids:
+                del self._postings[tok]
+                del self._tokens[bisect.bisect_left(self._tokens, tok)]
+
+    def remove_by_api_id(self, api_id):
+        event_id = self._by_api.get(api_id)
+        if event_id is not None: self.remove(event_id)
+
+    def update_odds(self, event_id, o1, ox, o2):
+        event = self._events.get(event_id)
+        if event: event.update(odds_local=o1, odds_draw=ox, odds_away=o2)
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            ids |= self._postings[self._tokens[i]]
+            i += 1
+        return ids
+
+    def search(self, query, limit=10):
+        result = None
+        for tok in tokenize(query):
+            ids = self._prefix_ids(tok)
+            result = ids if result is None else result & ids
+            if not result: return []
+        if not result: return []
+        events = sorted((self._events[i] for i in result), key=lambda ev: ev.get('event_date') or '')
+        return events[:limit]
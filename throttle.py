@@ -0,0 +1,80 @@
+import time
+import logging
+from collections import Counter
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+# Cada cuánto se limpian los diccionarios internos (segundos)
+SWEEP_INTERVAL = 60
+
+class UpdateThrottle:
+    """Capa previa a los handlers: token bucket por usuario y descarte de toques
+    repetidos (usuario, callback_data)."""
+
+    def __init__(self, rate=1.0, burst=5, dedupe_window=1.5, exempt_ids=()):
+        self.rate = rate                    # tokens que se recuperan por segundo
+        self.burst = burst                  # máximo de tokens acumulables
+        self.dedupe_window = dedupe_window  # segundos en los que un mismo toque se ignora
+        self.exempt_ids = set(exempt_ids)   # usuarios sin token bucket (admins)
+        self.suppressed = Counter()         # motivo -> eventos descartados
+        self._buckets = {}                  # user_id -> (tokens, último instante)
+        self._recent = {}                   # (user_id, data) -> instante del último toque aceptado
+        self._last_sweep = time.monotonic()
+
+    def _take_token(self, user_id, now):
+        tokens, last = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return False
+        self._buckets[user_id] = (tokens - 1, now)
+        return True
+
+    def _is_duplicate(self, key, now):
+        last = self._recent.get(key)
+        return last is not None and now - last < self.dedupe_window
+
+    def _sweep(self, now):
+        if now - self._last_sweep < SWEEP_INTERVAL: return
+        self._last_sweep = now
+        self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_window}
+        # Un bucket que ya se habría rellenado del todo equivale a no tenerlo
+        refill = self.burst / self.rate if self.rate else float('inf')
+        self._buckets = {u: b for u, b in self._buckets.items() if now - b[1] < refill}
+
+    async def _reject(self, update, reason):
+        self.suppressed[reason] += 1
+        # Siempre hay respuesta: si no, el usuario ve el bot colgado a mitad de una conversación
+        try:
+            if update.callback_query: await update.callback_query.answer("⏳ Espera un momento...")
+            elif update.message: await update.message.reply_text("⏳ Espera un momento...")
+        except Exception: pass
+
+    async def middleware(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler en un grupo negativo: corta el update con ApplicationHandlerStop"""
+        user = update.effective_user
+        # Las inline queries llegan una por tecla y se resuelven en memoria: no se limitan
+        if not user or update.inline_query: return
+        now = time.monotonic()
+        self._sweep(now)
+
+        reason = None
+        query = update.callback_query
+        if query and self._is_duplicate((user.id, query.data), now):
+            reason = 'duplicate'
+        elif user.id not in self.exempt_ids and not self._take_token(user.id, now):
+            reason = 'rate_limited'
+        if reason is None:
+            # Solo cuenta como toque aceptado el que pasa el token bucket
+            if query: self._recent[(user.id, query.data)] = now
+            return
+
+        await self._reject(update, reason)
+        logging.debug(f"Update de {user.id} descartado ({reason})")
+        raise ApplicationHandlerStop
+
+    def stats(self):
+        return {
+            'suppressed': dict(self.suppressed),
+            'tracked_users': len(self._buckets),
+        }